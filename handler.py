@@ -1,13 +1,37 @@
 # handler.py
 import os
+import contextlib
 import json
+import hashlib
+import io
+import itertools
+import math
+import queue
+import re
+import shutil
+import sqlite3
+import struct
+import threading
 import tempfile
-import urllib.request
+import types
 import uuid
-from typing import List, Dict, Any, Tuple
+import asyncio
+import atexit
+import time
+from collections import defaultdict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Dict, Any, BinaryIO, Iterable, Iterator, Optional, Tuple, Union
 
+import requests
 import runpod
 
+# CUDA caching allocator policy; must be set before torch initializes CUDA. Expandable segments
+# plus a split cap keep VRAM from fragmenting as batch shapes vary (duration bands, long-file
+# windows). PYTORCH_NO_CUDA_MEMORY_CACHING=1 (needed on some Blackwell driver stacks) turns the
+# caching allocator off, in which case no policy is applied.
+if os.getenv("PYTORCH_NO_CUDA_MEMORY_CACHING", "0") != "1":
+    os.environ.setdefault("PYTORCH_CUDA_ALLOC_CONF", "expandable_segments:True,max_split_size_mb:128")
+
 # -------------------------
 # Config
 # -------------------------
@@ -17,6 +41,23 @@ ASR_MODEL_NAME = os.getenv("PARAKEET_MODEL", "nvidia/parakeet-tdt-0.6b-v3")
 CACHE_DIR = os.getenv("HF_HOME", "/runpod-volume/model_cache")
 os.makedirs(CACHE_DIR, exist_ok=True)
 
+# Persistent {sha1(source identity): duration} index so warm runs skip probing audio.
+# Local disk by default: CACHE_DIR is usually the network volume shared by several workers, where
+# SQLite locking is unreliable (WAL is only used on local filesystems). Empty disables.
+DURATION_CACHE_PATH = os.getenv(
+    "DURATION_CACHE_PATH", os.path.join(tempfile.gettempdir(), "parakeet_durations.sqlite3"))
+
+# Long URL inputs are downloaded to files under TMP_ROOT: the /dev/shm tmpfs when writable, so
+# NeMo reads them from memory rather than (often network-backed) disk. At most TMP_SHM_MAX_BYTES
+# (summed Content-Length of live files) go there; the rest, and bodies of unknown size, use disk.
+_SHM_DIR = "/dev/shm"
+TMP_ROOT = (_SHM_DIR if os.path.isdir(_SHM_DIR) and os.access(_SHM_DIR, os.W_OK)
+            else tempfile.gettempdir())
+TMP_SHM_MAX_BYTES = int(os.getenv("TMP_SHM_MAX_BYTES", str(2 << 30)))  # 2 GiB
+
+# Bytes fetched via an HTTP Range request to read a WAV header before downloading the body
+WAV_PROBE_BYTES = int(os.getenv("WAV_PROBE_BYTES", "4096"))
+
 # Thresholds / batching knobs
 # Anything <= SHORT_MAX_SEC seconds is considered "short" and eligible for batching.
 SHORT_MAX_SEC = int(os.getenv("SHORT_MAX_SEC", "600"))  # 10 minutes
@@ -28,15 +69,100 @@ BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "16"))
 BATCH_MAX_TOTAL_SEC = int(
     os.getenv("BATCH_MAX_TOTAL_SEC", "1200"))  # 20 minutes
 
+# Model input sample rate; batch audio is handed to NeMo as arrays, so other rates and
+# multi-channel files are downmixed and resampled to this while batches are staged
+SAMPLE_RATE = 16000
+
+# Long files (> SHORT_MAX_SEC) are transcribed as overlapping windows batched like shorts:
+# each window spans LONG_CHUNK_BUFFER_SEC and contributes only the words that start inside its
+# central LONG_CHUNK_SEC stride (middle-token merge), so peak VRAM no longer grows with file length.
+LONG_CHUNK_SEC = float(os.getenv("LONG_CHUNK_SEC", "8"))
+LONG_CHUNK_BUFFER_SEC = float(os.getenv("LONG_CHUNK_BUFFER_SEC", "10"))
+
+# Width of the duration bands shorts are grouped into, so each batch pads to similar lengths
+DURATION_BAND_SEC = int(os.getenv("DURATION_BAND_SEC", "30"))
+
 # Attention switch for very long inputs (>24 min ~ full attention on A100-80GB)
 LOCAL_ATTENTION_AFTER_SEC = int(
     os.getenv("LOCAL_ATTENTION_AFTER_SEC", str(24 * 60)))
 
+# Max concurrent URL downloads per request
+DOWNLOAD_MAX_WORKERS = int(os.getenv("DOWNLOAD_MAX_WORKERS", "32"))
+
+# Mixed-precision autocast around transcription: "bf16" | "fp16" | "off"
+AMP_DTYPE = os.getenv("AMP_DTYPE", "bf16").lower()
+
+# Decoding strategy applied at load ("greedy_batch" = batched GPU greedy for CTC/RNNT/TDT;
+# e.g. "malsd_batch" / "beam" also work). Empty keeps the checkpoint's own decoding config.
+DECODING_STRATEGY = os.getenv("DECODING_STRATEGY", "greedy_batch")
+
+# Run the encoder through ONNX Runtime (TensorRT/CUDA EP) instead of eager PyTorch.
+# The exported graph is cached under CACHE_DIR. Requires onnx + onnxruntime-gpu.
+USE_ONNX = os.getenv("USE_ONNX", "0") in ("1", "true", "True")
+
+# TensorRT precision for the ONNX encoder: "fp16" (default, on GPU) or "int8" (post-training
+# quantized, fp16 kept for layers TRT won't run in int8). INT8 needs the TensorRT EP and a
+# calibration manifest: a text file with one local 16kHz mono WAV path per line, of which up to
+# ONNX_CALIB_MAX_ITEMS are run through the preprocessor. The table is cached with the graph.
+# Falls back to fp16 if calibration is not possible.
+ONNX_PRECISION = os.getenv("ONNX_PRECISION", "fp16").lower()
+ONNX_CALIB_MANIFEST = os.getenv("ONNX_CALIB_MANIFEST", "")
+ONNX_CALIB_MAX_ITEMS = int(os.getenv("ONNX_CALIB_MAX_ITEMS", "200"))
+
+# torch.compile the encoder (mode="reduce-overhead" => CUDA graphs per input shape). Encoder
+# inputs are padded onto a shape grid: mel frames up to COMPILE_PAD_SEC steps (+1 frame, so a
+# LONG_CHUNK_BUFFER_SEC window lands exactly on a step) and batch size up to a power of two, so
+# each bucket records one graph. Kernels are compiled with a dynamic time/batch axis, so a new
+# bucket records a graph without recompiling. Long-audio window batches and full batches up to
+# COMPILE_WARMUP_SEC are warmed up at load. Ignored when the ONNX encoder is active.
+USE_COMPILE = os.getenv("USE_COMPILE", "0") in ("1", "true", "True")
+COMPILE_PAD_SEC = float(os.getenv("COMPILE_PAD_SEC", "5"))
+COMPILE_WARMUP_SEC = int(os.getenv("COMPILE_WARMUP_SEC", "60"))
+
+# Debug only: record CUDA allocator history and, after every batch, assert that free-but-split
+# cached blocks stay under CUDA_MEMORY_DEBUG_MAX_FRAG of reserved memory. On failure a snapshot
+# (viewable at pytorch.org/memory_viz) is written to this directory first. Empty disables.
+CUDA_MEMORY_DEBUG_DIR = os.getenv("CUDA_MEMORY_DEBUG_DIR", "")
+CUDA_MEMORY_DEBUG_MAX_FRAG = float(os.getenv("CUDA_MEMORY_DEBUG_MAX_FRAG", "0.25"))
+
 # In local dev, avoid loading NeMo so you don't pull huge deps on macOS.
 SKIP_MODEL_LOAD = os.getenv("SKIP_MODEL_LOAD", "0") in ("1", "true", "True")
 
+# Run NeMo in a persistent spawned GPU worker process. The handler process then only downloads,
+# measures and decodes audio, handing each batch over as a shared-memory tensor, so several
+# invocations can be served at once (up to MAX_CONCURRENCY, Runpod concurrency_modifier).
+GPU_WORKER_PROCESS = os.getenv("GPU_WORKER_PROCESS", "0") in ("1", "true", "True")
+MAX_CONCURRENCY = int(os.getenv("MAX_CONCURRENCY", "1"))
+# A dead GPU worker is respawned after GPU_WORKER_RESTART_BACKOFF_SEC, doubling (up to a minute)
+# with each consecutive failure; after GPU_WORKER_MAX_RESTARTS in a row without a served batch
+# the handler process exits, so the platform replaces the pod.
+GPU_WORKER_MAX_RESTARTS = int(os.getenv("GPU_WORKER_MAX_RESTARTS", "3"))
+GPU_WORKER_RESTART_BACKOFF_SEC = float(os.getenv("GPU_WORKER_RESTART_BACKOFF_SEC", "2.0"))
+
+# Set only in the GPU worker's environment, so its import of this module loads the model
+_IN_GPU_WORKER = os.getenv("_PARAKEET_GPU_WORKER", "0") == "1"
+# Handler side of a GPU worker: no model here, batches are forwarded to the worker
+_GPU_CLIENT = GPU_WORKER_PROCESS and not SKIP_MODEL_LOAD and not _IN_GPU_WORKER
+
 MODEL = None
-if not SKIP_MODEL_LOAD:
+AUTOCAST_DTYPE = None  # torch dtype used for autocast, None when disabled
+ENCODER_BACKEND = "torch"  # "onnx" once the ONNX Runtime encoder is swapped in
+DEVICE = None  # torch.device batch audio is staged onto
+# Two reusable host (pinned on GPU) staging buffers for batch audio, flat float32, used
+# alternately so batch k+1 can be decoded while batch k's copy is still in flight
+_HOST_BUFS: List[Any] = []
+_HOST_BUF_FREE: List[Any] = [None, None]  # CUDA events marking each buffer's last H2D copy as done
+_HOST_BUF_SLOT = 0  # buffer the next batch is staged into
+_H2D_STREAM = None  # dedicated CUDA stream for host-to-device copies
+_CURRENT_ATTN = None  # encoder attention mode last applied: "local" | "global"
+_GPU_WORKER = None  # _GpuWorkerClient when batches run in the GPU worker process
+_TIME_STRIDE_SEC = None  # seconds per encoder output frame (unit of NeMo's *_offset timestamps)
+if _GPU_CLIENT:
+    import torch
+
+    # Batch audio is decoded into CPU shared memory; the worker does the H2D copy
+    DEVICE = torch.device("cpu")
+elif not SKIP_MODEL_LOAD:
     import torch
     import nemo.collections.asr as nemo_asr
 
@@ -56,68 +182,539 @@ if not SKIP_MODEL_LOAD:
             print(f"Warning: Failed to cache model: {e}")
 
     MODEL.eval()
+    _TIME_STRIDE_SEC = (MODEL.cfg.preprocessor.window_stride
+                        * MODEL.cfg.encoder.get("subsampling_factor", 1))
+    _CURRENT_ATTN = ("local" if MODEL.cfg.encoder.get("self_attention_model") == "rel_pos_local_attn"
+                     else "global")
+    # Inference only: drop grad requirements and BN/dropout state tracking once at load
+    MODEL.freeze()
+
+    if DECODING_STRATEGY:
+        from omegaconf import open_dict
+        try:
+            decoding_cfg = MODEL.cfg.decoding
+            with open_dict(decoding_cfg):
+                decoding_cfg.strategy = DECODING_STRATEGY
+                if "batched_inference" in decoding_cfg.get("greedy", {}):
+                    # Older CTC configs gate batched greedy behind this flag
+                    decoding_cfg.greedy.batched_inference = True
+            MODEL.change_decoding_strategy(decoding_cfg)
+            print(f"Decoding strategy set to {DECODING_STRATEGY}")
+        except Exception as e:
+            print(f"Warning: Failed to set decoding strategy {DECODING_STRATEGY}: {e}")
+
     if torch.cuda.is_available():
         MODEL = MODEL.to("cuda")
 
+        if AMP_DTYPE == "bf16" and not torch.cuda.is_bf16_supported():
+            print("Warning: bf16 not supported on this GPU, falling back to fp16 autocast")
+            AUTOCAST_DTYPE = torch.float16
+        elif AMP_DTYPE in ("bf16", "fp16"):
+            AUTOCAST_DTYPE = torch.bfloat16 if AMP_DTYPE == "bf16" else torch.float16
+
+    DEVICE = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    if torch.cuda.is_available() and not _IN_GPU_WORKER:
+        # Staging buffers sized for a full batch (BATCH_MAX_TOTAL_SEC of audio), reused across
+        # batches so H2D copies come from page-locked memory and don't churn the allocator.
+        # Not used on CPU, where the model reads the staged tensor itself (no copy to wait on),
+        # nor in the GPU worker, which copies straight from the handler's shared memory
+        _HOST_BUFS = [torch.empty(BATCH_MAX_TOTAL_SEC * SAMPLE_RATE, dtype=torch.float32,
+                                  pin_memory=True) for _ in range(2)]
+        _H2D_STREAM = torch.cuda.Stream()
+    if torch.cuda.is_available() and CUDA_MEMORY_DEBUG_DIR:
+        os.makedirs(CUDA_MEMORY_DEBUG_DIR, exist_ok=True)
+        torch.cuda.memory._record_memory_history(max_entries=100000)
+
+    if USE_ONNX:
+        import numpy as np
+        import onnxruntime as ort
+
+        # ORT tensor types of the encoder's outputs -> (torch dtype, numpy element type)
+        _ORT_DTYPES = {
+            "tensor(float)": (torch.float32, np.float32),
+            "tensor(float16)": (torch.float16, np.float16),
+            "tensor(int64)": (torch.int64, np.int64),
+            "tensor(int32)": (torch.int32, np.int32),
+        }
+
+        class _OrtEncoder(torch.nn.Module):
+            """
+            Drop-in for MODEL.encoder that runs the exported encoder graph in ONNX Runtime,
+            so MODEL.transcribe keeps NeMo's preprocessing, decoding and timestamps.
+            CUDA inputs and outputs are bound in place (IOBinding), so features never leave the GPU.
+            """
+
+            def __init__(self, session, torch_encoder):
+                super().__init__()
+                self.session = session
+                self.input_names = [i.name for i in session.get_inputs()]
+                outputs = session.get_outputs()[:2]
+                self.output_names = [o.name for o in outputs]
+                self.output_types = [_ORT_DTYPES.get(o.type) for o in outputs]
+                self.channels = outputs[0].shape[1]
+                # Plain list so the (CPU-parked) PyTorch encoder isn't registered as a submodule
+                self._torch_encoder = [torch_encoder]
+                # Encoded time length for a padded input length, so outputs can be preallocated on
+                # the GPU; None (unknown subsampling or output types) falls back to a host round trip
+                self._encoded_frames = None
+                try:
+                    from nemo.collections.asr.parts.submodules.subsampling import calc_length
+
+                    pre = torch_encoder.pre_encode
+                    length_args = dict(
+                        all_paddings=pre._left_padding + pre._right_padding,
+                        kernel_size=pre._kernel_size, stride=pre._stride,
+                        ceil_mode=pre._ceil_mode, repeat_num=pre._sampling_num,
+                    )
+                    if isinstance(self.channels, int) and None not in self.output_types:
+                        self._encoded_frames = lambda frames: int(
+                            calc_length(torch.tensor([frames], dtype=torch.float), **length_args)[0])
+                except (ImportError, AttributeError):
+                    pass
+
+            def __getattr__(self, name):
+                # Attributes NeMo reads off the encoder (subsampling_factor, ...) come from the original
+                try:
+                    return super().__getattr__(name)
+                except AttributeError:
+                    return getattr(self._torch_encoder[0], name)
+
+            def freeze(self):
+                pass
+
+            def unfreeze(self, partial: bool = False):
+                pass
+
+            def change_attention_model(self, *args, **kwargs):
+                # Would otherwise reach the parked PyTorch encoder and change a module that never runs
+                print("Warning: attention model is fixed in the exported ONNX encoder; not changed")
+
+            def forward(self, audio_signal, length, **kwargs):
+                if audio_signal.is_cuda and self._encoded_frames is not None:
+                    try:
+                        return self._forward_bound(audio_signal, length)
+                    except Exception as e:
+                        print(f"Warning: ONNX IOBinding failed, copying encoder tensors via host: {e}")
+                        self._encoded_frames = None
+                feeds = {
+                    self.input_names[0]: audio_signal.float().cpu().numpy(),
+                    self.input_names[1]: length.cpu().numpy().astype(np.int64),
+                }
+                outputs, encoded_lengths = self.session.run(None, feeds)[:2]
+                return (torch.from_numpy(outputs).to(audio_signal.device),
+                        torch.from_numpy(encoded_lengths).to(length.device))
+
+            def _forward_bound(self, audio_signal, length):
+                audio_signal = audio_signal.float().contiguous()
+                length = length.to(torch.int64).contiguous()
+                device = audio_signal.device
+                batch, _, frames = audio_signal.shape
+                (out_dtype, out_np), (len_dtype, len_np) = self.output_types
+                outputs = torch.empty(batch, self.channels, self._encoded_frames(frames),
+                                      dtype=out_dtype, device=device)
+                encoded_lengths = torch.empty(batch, dtype=len_dtype, device=device)
+
+                binding = self.session.io_binding()
+                for name, t, np_type in ((self.input_names[0], audio_signal, np.float32),
+                                         (self.input_names[1], length, np.int64)):
+                    binding.bind_input(name, "cuda", device.index, np_type, tuple(t.shape), t.data_ptr())
+                for name, t, np_type in ((self.output_names[0], outputs, out_np),
+                                         (self.output_names[1], encoded_lengths, len_np)):
+                    binding.bind_output(name, "cuda", device.index, np_type, tuple(t.shape), t.data_ptr())
+                # ORT runs on its own CUDA stream: the features must be written before it reads them
+                torch.cuda.current_stream(device).synchronize()
+                self.session.run_with_iobinding(binding)
+                return outputs, encoded_lengths
+
+        def _write_int8_calibration(onnx_path: str, table_dir: str):
+            """
+            Entropy-calibrate the exported encoder over mel features of the manifest clips and
+            write an ORT calibration table (calibration.flatbuffers) for the TensorRT EP.
+            """
+            import soundfile as sf
+            from onnxruntime.quantization import CalibrationDataReader, CalibrationMethod
+            from onnxruntime.quantization.calibrate import create_calibrator, write_calibration_table
+
+            with open(ONNX_CALIB_MANIFEST) as f:
+                paths = [line.strip() for line in f if line.strip()][:ONNX_CALIB_MAX_ITEMS]
+            if not paths:
+                raise ValueError(f"No calibration clips listed in {ONNX_CALIB_MANIFEST}")
+            # Clips are cut to one long-audio window so calibration memory stays bounded
+            max_frames = int(LONG_CHUNK_BUFFER_SEC * SAMPLE_RATE)
+
+            class _MelReader(CalibrationDataReader):
+                def __init__(self):
+                    self.paths = iter(paths)
+
+                def get_next(self):
+                    for p in self.paths:
+                        audio, sr = sf.read(p, dtype="float32", frames=max_frames)
+                        if sr != SAMPLE_RATE or audio.ndim != 1:
+                            print(f"Warning: skipping calibration clip {p} (needs {SAMPLE_RATE}Hz mono)")
+                            continue
+                        signal = torch.from_numpy(audio)[None].to(DEVICE)
+                        length = torch.tensor([signal.shape[1]], device=DEVICE)
+                        with torch.inference_mode():
+                            mel, mel_len = MODEL.preprocessor(input_signal=signal, length=length)
+                        return {"audio_signal": mel.float().cpu().numpy(),
+                                "length": mel_len.cpu().numpy().astype(np.int64)}
+                    return None
+
+            tmp_dir = f"{table_dir}.tmp-{uuid.uuid4().hex}"
+            os.makedirs(tmp_dir)
+            try:
+                calibrator = create_calibrator(
+                    onnx_path,
+                    augmented_model_path=os.path.join(tmp_dir, "augmented.onnx"),
+                    calibrate_method=CalibrationMethod.Entropy,
+                    # The fp32 encoder is >2GB, so its export (and the augmented copy) uses external data
+                    use_external_data_format=True,
+                )
+                calibrator.collect_data(_MelReader())
+                write_calibration_table(calibrator.compute_data(), dir=tmp_dir)
+                os.replace(os.path.join(tmp_dir, "calibration.flatbuffers"),
+                           os.path.join(table_dir, "calibration.flatbuffers"))
+            finally:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        onnx_dir = os.path.join(CACHE_DIR, ASR_MODEL_NAME.replace("/", "_") + "_onnx")
+        onnx_path = os.path.join(onnx_dir, "encoder.onnx")
+        try:
+            if not os.path.exists(onnx_path):
+                print(f"Exporting encoder to ONNX at {onnx_path}")
+                # Export into a scratch dir first so a crash never leaves a half-written graph cached
+                tmp_dir = f"{onnx_dir}.tmp-{uuid.uuid4().hex}"
+                os.makedirs(tmp_dir)
+                try:
+                    MODEL.encoder.export(
+                        os.path.join(tmp_dir, "encoder.onnx"),
+                        dynamic_axes={
+                            "audio_signal": {0: "batch", 2: "time"},
+                            "length": {0: "batch"},
+                            "outputs": {0: "batch", 2: "time"},
+                            "encoded_lengths": {0: "batch"},
+                        },
+                    )
+                    os.replace(tmp_dir, onnx_dir)
+                finally:
+                    shutil.rmtree(tmp_dir, ignore_errors=True)
+
+            available = ort.get_available_providers()
+            use_int8 = False
+            if ONNX_PRECISION == "int8":
+                # Engines are cached per precision so an fp16 fallback never reuses an int8 engine
+                int8_dir = os.path.join(onnx_dir, "int8")
+                os.makedirs(int8_dir, exist_ok=True)
+                try:
+                    if "TensorrtExecutionProvider" not in available:
+                        raise RuntimeError("TensorrtExecutionProvider is not available")
+                    if not os.path.exists(os.path.join(int8_dir, "calibration.flatbuffers")):
+                        if not ONNX_CALIB_MANIFEST:
+                            raise ValueError("ONNX_CALIB_MANIFEST is not set")
+                        print(f"Calibrating int8 encoder from {ONNX_CALIB_MANIFEST}")
+                        _write_int8_calibration(onnx_path, int8_dir)
+                    use_int8 = True
+                except Exception as e:
+                    print(f"Warning: int8 encoder unavailable, using fp16: {e}")
+
+            # One explicit TensorRT optimization profile covering every shape a batch can take
+            # (batch 1..BATCH_MAX_ITEMS, up to SHORT_MAX_SEC of mel frames), so varying batches
+            # never trigger an engine rebuild mid-request. Optimized for long-audio window batches.
+            feat_in = MODEL.cfg.preprocessor.features
+            window_stride = MODEL.cfg.preprocessor.window_stride
+            max_frames = int(math.ceil(SHORT_MAX_SEC / window_stride)) + 1
+            opt_frames = int(round(LONG_CHUNK_BUFFER_SEC / window_stride)) + 1
+
+            def _trt_shapes(batch: int, frames: int) -> str:
+                return f"audio_signal:{batch}x{feat_in}x{frames},length:{batch}"
+
+            providers = []
+            if "TensorrtExecutionProvider" in available:
+                trt_options = {
+                    "trt_fp16_enable": AUTOCAST_DTYPE is not None,
+                    "trt_engine_cache_enable": True,
+                    "trt_engine_cache_path": onnx_dir,
+                    "trt_profile_min_shapes": _trt_shapes(1, 1),
+                    "trt_profile_opt_shapes": _trt_shapes(BATCH_MAX_ITEMS, opt_frames),
+                    "trt_profile_max_shapes": _trt_shapes(BATCH_MAX_ITEMS, max_frames),
+                }
+                if use_int8:
+                    trt_options.update({
+                        "trt_fp16_enable": True,
+                        "trt_int8_enable": True,
+                        "trt_int8_calibration_table_name": "calibration.flatbuffers",
+                        "trt_int8_use_native_calibration_table": False,
+                        "trt_engine_cache_path": int8_dir,
+                    })
+                providers.append(("TensorrtExecutionProvider", trt_options))
+            if "CUDAExecutionProvider" in available:
+                providers.append("CUDAExecutionProvider")
+            providers.append("CPUExecutionProvider")
+
+            session = ort.InferenceSession(onnx_path, providers=providers)
+            if session.get_providers()[0] == "TensorrtExecutionProvider":
+                # TensorRT builds (or loads the cached) engine on first run: do it now, not in a request
+                print("Building TensorRT encoder engine")
+                session.run(None, {
+                    "audio_signal": np.zeros((BATCH_MAX_ITEMS, feat_in, opt_frames), dtype=np.float32),
+                    "length": np.full((BATCH_MAX_ITEMS,), opt_frames, dtype=np.int64),
+                })
+            MODEL.encoder = _OrtEncoder(session, MODEL.encoder.cpu())
+            ENCODER_BACKEND = "onnx"
+            print(f"Using ONNX Runtime encoder ({session.get_providers()[0]}"
+                  f"{', int8' if use_int8 else ''})")
+        except Exception as e:
+            print(f"Warning: ONNX encoder unavailable, using PyTorch encoder: {e}")
+
+    if USE_COMPILE and ENCODER_BACKEND == "torch" and torch.cuda.is_available():
+        import torch._dynamo
+
+        class _BucketedEncoder(torch.nn.Module):
+            """
+            Drop-in for MODEL.encoder that pads each batch onto the compile shape grid before calling
+            the compiled encoder. Padded frames are masked by the unchanged lengths, and padded batch
+            rows are dropped from the outputs.
+            """
+
+            def __init__(self, compiled, frame_step: int):
+                super().__init__()
+                self.compiled = compiled
+                self.frame_step = frame_step
+
+            def __getattr__(self, name):
+                # Attributes NeMo reads off the encoder come from the compiled (wrapped) original
+                try:
+                    return super().__getattr__(name)
+                except AttributeError:
+                    return getattr(self.compiled, name)
+
+            def bucket(self, batch: int, frames: int) -> Tuple[int, int]:
+                padded_frames = -(-(frames - 1) // self.frame_step) * self.frame_step + 1
+                padded_batch = min(1 << (batch - 1).bit_length(), max(batch, BATCH_MAX_ITEMS))
+                return padded_batch, padded_frames
+
+            def forward(self, audio_signal, length, **kwargs):
+                batch, _, frames = audio_signal.shape
+                padded_batch, padded_frames = self.bucket(batch, frames)
+                audio_signal = torch.nn.functional.pad(
+                    audio_signal, (0, padded_frames - frames, 0, 0, 0, padded_batch - batch))
+                # Padding rows get a full length so the encoder's masks never see an empty row
+                length = torch.cat([length, length.new_full((padded_batch - batch,), frames)])
+                # Each call is a new CUDA graph step; clone so outputs outlive the next replay
+                torch.compiler.cudagraph_mark_step_begin()
+                outputs, encoded_lengths = self.compiled(
+                    audio_signal=audio_signal, length=length, **kwargs)[:2]
+                return outputs[:batch].clone(), encoded_lengths[:batch].clone()
+
+        eager_encoder = MODEL.encoder
+        try:
+            window_stride = MODEL.cfg.preprocessor.window_stride
+            frame_step = max(1, int(round(COMPILE_PAD_SEC / window_stride)))
+            torch._dynamo.config.cache_size_limit = max(torch._dynamo.config.cache_size_limit, 64)
+            MODEL.encoder = _BucketedEncoder(
+                torch.compile(MODEL.encoder, mode="reduce-overhead", fullgraph=False, dynamic=True),
+                frame_step)
+
+            # Hot shapes: long-audio windows at every batch bucket, full batches per short step
+            batch_sizes = sorted({MODEL.encoder.bucket(b, 1)[0] for b in range(1, BATCH_MAX_ITEMS + 1)})
+            window_frames = MODEL.encoder.bucket(1, int(round(LONG_CHUNK_BUFFER_SEC / window_stride)) + 1)[1]
+            warmup_shapes = {(b, window_frames) for b in batch_sizes}
+            steps = max(1, int(COMPILE_WARMUP_SEC // COMPILE_PAD_SEC))
+            warmup_shapes |= {(BATCH_MAX_ITEMS, k * frame_step + 1) for k in range(1, steps + 1)}
+
+            feat_in = MODEL.cfg.preprocessor.features
+            autocast = (torch.autocast("cuda", dtype=AUTOCAST_DTYPE)
+                        if AUTOCAST_DTYPE is not None else contextlib.nullcontext())
+            with torch.inference_mode(), autocast:
+                for batch, frames in sorted(warmup_shapes):
+                    print(f"Compiling encoder for {batch}x{frames} frames")
+                    MODEL.encoder(
+                        audio_signal=torch.zeros(batch, feat_in, frames, device="cuda"),
+                        length=torch.full((batch,), frames, device="cuda", dtype=torch.long),
+                    )
+        except Exception as e:
+            print(f"Warning: torch.compile of encoder failed, using eager encoder: {e}")
+            MODEL.encoder = eager_encoder
+
+
+# Shared HTTP session so concurrent downloads reuse pooled TCP/TLS connections
+_HTTP = requests.Session()
+_HTTP.mount("http://", requests.adapters.HTTPAdapter(pool_maxsize=DOWNLOAD_MAX_WORKERS))
+_HTTP.mount("https://", requests.adapters.HTTPAdapter(pool_maxsize=DOWNLOAD_MAX_WORKERS))
+
 
 # -------------------------
 # Helpers
 # -------------------------
-def _validate_wav_format(src: str) -> str:
+# ".wav" at the end of the source; for http(s) URLs, right before the (first) query string.
+# Local paths are matched whole, so a "?" in a file name is just a character.
+_WAV_SOURCE_RE = re.compile(r"(?:http[^?]*\.(?i:wav)(?:\?|\Z)|(?!http).*\.(?i:wav)\Z)", re.DOTALL)
+
+
+def _validate_wav_formats(inputs: List[Dict[str, Any]]):
     """
-    Validate that the source is a properly formatted 16kHz mono WAV file.
-    Returns the source path if valid, raises ValueError if not.
+    Validate that every source names a WAV file (other rates/channel counts are converted to
+    16kHz mono when audio is loaded).
+    One regex search per source, no filesystem or network access; raises a single ValueError
+    listing every invalid source.
     """
-    # Extract filename from URL (remove query parameters)
-    if src.startswith('http'):
-        filename = src.split('?')[0]  # Remove query params
-    else:
-        filename = src
+    invalid = [item["source"] for item in inputs if not _WAV_SOURCE_RE.match(item["source"])]
+    if invalid:
+        raise ValueError(
+            f"Invalid audio format for {', '.join(invalid)}: File must be WAV format. "
+            f"Required: 16kHz mono WAV file.")
 
-    if not filename.lower().endswith('.wav'):
-        raise ValueError(f"File must be WAV format. Got filename: {filename}")
 
-    return src
+_SHM_RESERVED: Dict[str, int] = {}  # temp file path -> bytes it holds against TMP_SHM_MAX_BYTES
+_SHM_LOCK = threading.Lock()
+
+
+def _reserve_tmp_file(size: Optional[int]) -> str:
+    """
+    Pick a path for a downloaded body of `size` bytes: under TMP_ROOT if it is the tmpfs and the
+    body fits both the cap and the tmpfs's free space, otherwise on disk.
+    """
+    name = f"audio-{uuid.uuid4().hex}.wav"
+    if TMP_ROOT == _SHM_DIR and size is not None:
+        with _SHM_LOCK:
+            used = sum(_SHM_RESERVED.values())
+            if used + size <= TMP_SHM_MAX_BYTES and size < shutil.disk_usage(_SHM_DIR).free:
+                path = os.path.join(_SHM_DIR, name)
+                _SHM_RESERVED[path] = size
+                return path
+    return os.path.join(tempfile.gettempdir(), name)
+
+
+def _release_tmp_file(path: str):
+    """Remove a downloaded temp file and return its tmpfs reservation, if any."""
+    try:
+        os.remove(path)
+    except:
+        pass
+    with _SHM_LOCK:
+        _SHM_RESERVED.pop(path, None)
 
 
 def _download_url_to_temp(url: str) -> str:
     """
-    Download URL to temporary file for NeMo processing.
+    Download URL to temporary file for NeMo processing (tmpfs-backed when it fits).
     Returns path to temporary file.
     """
-    tmp_dir = tempfile.gettempdir()
-    tmp_file = os.path.join(tmp_dir, f"audio-{uuid.uuid4().hex}.wav")
-
+    tmp_file = None
     try:
-        urllib.request.urlretrieve(url, tmp_file)
+        with _HTTP.get(url, stream=True, timeout=60) as r:
+            r.raise_for_status()
+            length = r.headers.get("Content-Length")
+            tmp_file = _reserve_tmp_file(int(length) if length and length.isdigit() else None)
+            r.raw.decode_content = True
+            with open(tmp_file, "wb") as f:
+                shutil.copyfileobj(r.raw, f, length=1 << 20)
+        _fadvise(tmp_file, "POSIX_FADV_SEQUENTIAL", "POSIX_FADV_WILLNEED")
         return tmp_file
     except Exception as e:
         # Clean up failed download
-        try:
-            os.remove(tmp_file)
-        except:
-            pass
+        if tmp_file is not None:
+            _release_tmp_file(tmp_file)
+        raise ValueError(f"Failed to download audio file: {e}")
+
+
+def _fadvise(path: str, *advice: str):
+    """
+    Pass page-cache hints for a whole file to the kernel (Linux only; best effort).
+    advice: os.POSIX_FADV_* constant names, applied in order.
+    """
+    if not hasattr(os, "posix_fadvise"):
+        return
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        for name in advice:
+            os.posix_fadvise(fd, 0, 0, getattr(os, name))
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _download_url_to_buffer(url: str) -> io.BytesIO:
+    """
+    Download URL into memory. soundfile decodes straight from the buffer into the batch
+    staging buffer, so short clips never take a write-then-read trip through the filesystem.
+    """
+    try:
+        with _HTTP.get(url, timeout=60) as r:
+            r.raise_for_status()
+            return io.BytesIO(r.content)
+    except Exception as e:
         raise ValueError(f"Failed to download audio file: {e}")
 
 
 def _cleanup_files(paths: List[str]):
     """Clean up temporary files."""
     for path in paths:
-        try:
-            os.remove(path)
-        except:
-            pass
+        # Drop cached pages first so dead audio doesn't crowd the page cache
+        _fadvise(path, "POSIX_FADV_DONTNEED")
+        _release_tmp_file(path)
+
+
+# fmt chunk format tags whose data chunk is plain frames: PCM, IEEE float, WAVE_FORMAT_EXTENSIBLE
+_WAV_LINEAR_FORMATS = (0x0001, 0x0003, 0xFFFE)
+
+
+def _parse_wav_duration(f: BinaryIO, file_size: Optional[int] = None) -> Optional[float]:
+    """
+    Compute duration from the RIFF/WAVE `fmt ` and `data` chunk headers without decoding audio.
+    Returns None for non-PCM, streamed (unknown data size) or malformed/truncated headers.
+    """
+    riff = f.read(12)
+    if len(riff) < 12 or riff[:4] != b"RIFF" or riff[8:12] != b"WAVE":
+        return None
+
+    bytes_per_sec = None
+    while True:
+        header = f.read(8)
+        if len(header) < 8:
+            return None
+        chunk_id, size = struct.unpack("<4sI", header)
+
+        if chunk_id == b"fmt ":
+            body = f.read(16)
+            if size < 16 or len(body) < 16:
+                return None
+            fmt_tag, channels, sample_rate, _, block_align, bits = struct.unpack("<HHIIHH", body)
+            if fmt_tag not in _WAV_LINEAR_FORMATS or not (channels and sample_rate and bits):
+                return None
+            frame_bytes = block_align or channels * bits / 8
+            bytes_per_sec = sample_rate * frame_bytes
+            f.seek(size - 16 + (size & 1), os.SEEK_CUR)
+        elif chunk_id == b"data":
+            if bytes_per_sec is None or size in (0, 0xFFFFFFFF):
+                return None
+            if file_size is not None:
+                # Truncated files: trust what is actually on disk
+                size = min(size, file_size - f.tell())
+            return size / bytes_per_sec
+        else:
+            # Skip LIST/fact/etc. (chunks are word-aligned)
+            f.seek(size + (size & 1), os.SEEK_CUR)
 
 
 def _get_duration_seconds(wav_path: str) -> float:
     """
-    Get duration using soundfile library instead of ffprobe.
+    Get duration from the WAV header; fall back to soundfile for non-PCM/malformed headers.
     """
     if SKIP_MODEL_LOAD:
         # Return dummy duration for dry-run mode
         return 7.5
 
     try:
+        with open(wav_path, "rb") as f:
+            dur = _parse_wav_duration(f, os.fstat(f.fileno()).st_size)
+        if dur is not None:
+            return dur
+
         import soundfile as sf
         with sf.SoundFile(wav_path) as f:
             return len(f) / f.samplerate
@@ -125,12 +722,334 @@ def _get_duration_seconds(wav_path: str) -> float:
         raise ValueError(f"Could not determine duration for {wav_path}: {e}")
 
 
+def _probe_duration_http(url: str) -> Optional[float]:
+    """
+    Fetch only the leading WAV_PROBE_BYTES of a URL via an HTTP Range request and parse the
+    WAV header for its duration. Returns None if the header can't be parsed from that prefix
+    or the probe request fails (the caller then measures the full download instead).
+    """
+    try:
+        with _HTTP.get(url, headers={"Range": f"bytes=0-{WAV_PROBE_BYTES - 1}"},
+                       stream=True, timeout=10) as r:
+            r.raise_for_status()
+            # Servers that ignore Range answer 200 with the full body; read just the prefix
+            head = r.raw.read(WAV_PROBE_BYTES)
+            total = r.headers.get("Content-Range", "").rpartition("/")[2]
+            if r.status_code != 206:
+                total = r.headers.get("Content-Length", "")
+    except Exception as e:
+        # Only an optimisation: a rejected/slow Range GET must not fail an input the full GET serves
+        print(f"Warning: header probe failed for {url}, measuring full download: {e}")
+        return None
+
+    file_size = int(total) if total.isdigit() else None
+    return _parse_wav_duration(io.BytesIO(head), file_size)
+
+
+_DURATION_DB: Optional[sqlite3.Connection] = None
+_DURATION_DB_LOCK = threading.Lock()
+
+
+# Filesystem types SQLite's WAL mode (shared-memory index) can't be used on
+_NETWORK_FS_TYPES = ("nfs", "nfs4", "cifs", "smb3", "smbfs", "fuse", "9p", "ceph", "glusterfs", "lustre")
+
+
+def _on_network_fs(path: str) -> bool:
+    """Whether path lives on a network/FUSE mount, from the longest matching /proc/mounts entry."""
+    path = os.path.realpath(path)
+    best, fstype = "", ""
+    try:
+        with open("/proc/mounts") as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) < 3:
+                    continue
+                mount = fields[1]
+                inside = path == mount or path.startswith(mount.rstrip("/") + "/")
+                if inside and len(mount) > len(best):
+                    best, fstype = mount, fields[2]
+    except OSError:
+        return False
+    return fstype.split(".")[0] in _NETWORK_FS_TYPES
+
+
+def _duration_db() -> sqlite3.Connection:
+    """Open (once) the duration cache database. Caller must hold _DURATION_DB_LOCK."""
+    global _DURATION_DB
+    if _DURATION_DB is None:
+        conn = sqlite3.connect(DURATION_CACHE_PATH, check_same_thread=False)
+        if _on_network_fs(os.path.dirname(os.path.abspath(DURATION_CACHE_PATH))):
+            conn.execute("PRAGMA journal_mode=DELETE")
+        else:
+            conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS durations (key TEXT PRIMARY KEY, duration REAL NOT NULL)")
+        _DURATION_DB = conn
+    return _DURATION_DB
+
+
+def _duration_cache_key(src: str) -> Optional[str]:
+    """
+    Identify a source without reading its audio:
+    URLs by (url without query, Content-Length, ETag) from a HEAD request,
+    local files by (absolute path, size, mtime). Returns None if it can't be keyed.
+    """
+    try:
+        if src.startswith('http'):
+            r = _HTTP.head(src, allow_redirects=True, timeout=10)
+            r.raise_for_status()
+            size = r.headers.get("Content-Length")
+            if not size:
+                return None
+            ident = f"{src.split('?')[0]}|{size}|{r.headers.get('ETag', '')}"
+        else:
+            st = os.stat(src)
+            ident = f"{os.path.abspath(src)}|{st.st_size}|{st.st_mtime_ns}"
+    except Exception:
+        return None
+    return hashlib.sha1(ident.encode("utf-8")).hexdigest()
+
+
+def _load_duration_cache(key: str) -> Optional[float]:
+    """Return the cached duration for key, or None on miss / cache error."""
+    try:
+        with _DURATION_DB_LOCK:
+            row = _duration_db().execute(
+                "SELECT duration FROM durations WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+    except sqlite3.Error as e:
+        print(f"Warning: duration cache lookup failed: {e}")
+        return None
+
+
+def _save_duration_cache(key: str, duration: float):
+    """Write back a probed duration; cache errors are non-fatal."""
+    try:
+        with _DURATION_DB_LOCK:
+            conn = _duration_db()
+            conn.execute(
+                "INSERT OR REPLACE INTO durations (key, duration) VALUES (?, ?)", (key, duration))
+            conn.commit()
+    except sqlite3.Error as e:
+        print(f"Warning: duration cache write failed: {e}")
+
+
+def _fetch_url(url: str, temp_files: List[str]) -> str:
+    """Download url to a tracked temp file and return its path."""
+    local_path = _download_url_to_temp(url)
+    temp_files.append(local_path)
+    return local_path
+
+
+def _get_cached_duration(src: str, temp_files: List[str]) -> Tuple[str, float]:
+    """
+    Look up the duration cache before fetching/probing src; write back on miss.
+    Returns (path, duration_sec); URLs are only downloaded on a cache miss.
+    """
+    key = None
+    if DURATION_CACHE_PATH and not SKIP_MODEL_LOAD:
+        key = _duration_cache_key(src)
+    if key:
+        cached = _load_duration_cache(key)
+        if cached is not None:
+            return src, cached
+
+    local_path = _fetch_url(src, temp_files) if src.startswith('http') else src
+    dur = _get_duration_seconds(local_path)
+    if key:
+        _save_duration_cache(key, dur)
+    return local_path, dur
+
+
+def _inference_context() -> contextlib.ExitStack:
+    """
+    inference_mode (no autograd bookkeeping) plus autocast when AMP is enabled on GPU.
+    """
+    stack = contextlib.ExitStack()
+    stack.enter_context(torch.inference_mode())
+    if AUTOCAST_DTYPE is not None:
+        stack.enter_context(torch.autocast("cuda", dtype=AUTOCAST_DTYPE))
+    return stack
+
+
+def _to_model_rate(audio: "np.ndarray", sample_rate: int) -> "np.ndarray":
+    """Downmix (frames, channels) float32 audio to mono and resample it to SAMPLE_RATE."""
+    import librosa
+
+    mono = audio.mean(axis=1) if audio.shape[1] > 1 else audio[:, 0]
+    if sample_rate == SAMPLE_RATE:
+        return mono
+    return librosa.resample(mono, orig_sr=sample_rate, target_sr=SAMPLE_RATE)
+
+
+def _load_batch_tensor(segments: List[Tuple[Union[str, BinaryIO], int, int]]
+                       ) -> Tuple["torch.Tensor", List[int], Optional["torch.cuda.Event"]]:
+    """
+    Decode a batch of WAV segments (path or in-memory file, start_frame, frames in SAMPLE_RATE
+    samples; frames=-1 reads to EOF) straight into the next pinned staging buffer (packed back
+    to back; files that aren't 16kHz mono are downmixed and resampled on the way) and copy it
+    to DEVICE with one non-blocking transfer on _H2D_STREAM, so it overlaps with compute on the
+    default stream. Returns the flat device tensor, per-segment lengths and an event the compute
+    stream must wait on before using it (None off-GPU). Off-GPU the flat tensor is a fresh CPU
+    tensor per batch instead (shared memory for a GPU worker, so it reaches it without a copy).
+    """
+    global _HOST_BUF_SLOT
+    import soundfile as sf
+
+    slot = _HOST_BUF_SLOT
+    if _HOST_BUFS:
+        _HOST_BUF_SLOT ^= 1
+
+    files, spans, lengths = [], [], []
+    try:
+        for p, start, frames in segments:
+            f = sf.SoundFile(p)
+            files.append(f)
+            # Segment bounds are in SAMPLE_RATE samples; read the matching span of the file's own
+            ratio = f.samplerate / SAMPLE_RATE
+            native_start = int(round(start * ratio))
+            available = max(0, f.frames - native_start)
+            native_frames = available if frames < 0 else min(int(round(frames * ratio)), available)
+            spans.append((native_start, native_frames))
+            # Never hand NeMo an empty clip (a declared duration longer than the file)
+            lengths.append(max(1, int(round(native_frames / ratio))))
+        total = sum(lengths)
+
+        if _HOST_BUFS:
+            # This buffer's previous copy must be done before its samples are overwritten
+            if _HOST_BUF_FREE[slot] is not None:
+                _HOST_BUF_FREE[slot].synchronize()
+            if _HOST_BUFS[slot].numel() < total:
+                _HOST_BUFS[slot] = torch.empty(total, dtype=torch.float32, pin_memory=True)
+            host_buf = _HOST_BUFS[slot]
+        elif _GPU_CLIENT:
+            # Per batch (not reused): concurrent invocations each stage their own batches
+            host_buf = torch.empty(total, dtype=torch.float32).share_memory_()
+        else:
+            # CPU inference: the model reads this tensor directly, possibly while the next batch is
+            # being staged, so each batch gets its own
+            host_buf = torch.empty(total, dtype=torch.float32)
+
+        host = host_buf.numpy()
+        offset = 0
+        for f, (start, native_frames), n in zip(files, spans, lengths):
+            out = host[offset:offset + n]
+            read = 0
+            if native_frames:
+                f.seek(start)
+                if f.samplerate == SAMPLE_RATE and f.channels == 1:
+                    read = f.read(frames=n, dtype="float32", out=out).shape[0]
+                else:
+                    audio = _to_model_rate(f.read(frames=native_frames, dtype="float32", always_2d=True),
+                                           f.samplerate)[:n]
+                    read = len(audio)
+                    out[:read] = audio
+            out[read:] = 0.0
+            offset += n
+    finally:
+        for f in files:
+            f.close()
+
+    ready = None
+    if _H2D_STREAM is not None:
+        with torch.cuda.stream(_H2D_STREAM):
+            device_buf = host_buf[:total].to(DEVICE, non_blocking=True)
+            ready = torch.cuda.Event()
+            ready.record(_H2D_STREAM)
+        _HOST_BUF_FREE[slot] = ready
+    else:
+        device_buf = host_buf[:total].to(DEVICE)
+    return device_buf, lengths, ready
+
+
+def _chunk_window(k: int, n_chunks: int) -> Tuple[float, Optional[float]]:
+    """
+    (start_sec, length_sec) of long-file window k; the last window runs to EOF (length None).
+    Window k covers its stride [k*C, (k+1)*C) plus (buffer - C) / 2 of context on each side.
+    Starts are floored onto the encoder frame grid (once the model's stride is known), so a word
+    gets the same absolute time in both windows that see it and the merge can't drop or repeat it.
+    """
+    margin = (LONG_CHUNK_BUFFER_SEC - LONG_CHUNK_SEC) / 2
+    start = max(0.0, k * LONG_CHUNK_SEC - margin)
+    if _TIME_STRIDE_SEC:
+        start = math.floor(start / _TIME_STRIDE_SEC + 1e-9) * _TIME_STRIDE_SEC
+    if k == n_chunks - 1:
+        return start, None
+    return start, (k + 1) * LONG_CHUNK_SEC + margin - start
+
+
+def _segments_from_words(words: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Rebuild segment timestamps from merged words, splitting after sentence-final punctuation
+    (NeMo's default segment delimiters). Entries have NeMo's segment keys; NeMo's optional
+    segment_gap_threshold splitting is not applied.
+    """
+    segments, current = [], []
+    for w in words:
+        current.append(w)
+        if w["word"][-1:] in ".?!":
+            segments.append(current)
+            current = []
+    if current:
+        segments.append(current)
+    merged = []
+    for seg in segments:
+        entry = {"segment": " ".join(w["word"] for w in seg)}
+        for key in ("start_offset", "start"):
+            if key in seg[0]:
+                entry[key] = seg[0][key]
+        for key in ("end_offset", "end"):
+            if key in seg[-1]:
+                entry[key] = seg[-1][key]
+        merged.append(entry)
+    return merged
+
+
+def _merge_chunks(outs: List[Any]) -> Tuple[str, Dict[str, Any]]:
+    """
+    Middle-token merge of a long file's window hypotheses: window k keeps only the words whose
+    (absolute) start falls inside its own stride, so overlapping context is never emitted twice.
+    Returns (text, {"word": [...], "segment": [...]}) with times relative to the whole file.
+    Word entries keep every key NeMo produced; start/end (seconds) and start_offset/end_offset
+    (encoder frames) are shifted by the window's start.
+    """
+    words = []
+    for k, out in enumerate(outs):
+        start, _ = _chunk_window(k, len(outs))
+        # Whole frames: window starts are on the encoder frame grid
+        frame_shift = int(round(start / _TIME_STRIDE_SEC)) if _TIME_STRIDE_SEC else None
+        keep_lo = k * LONG_CHUNK_SEC
+        keep_hi = (k + 1) * LONG_CHUNK_SEC if k < len(outs) - 1 else float("inf")
+        timestamp = getattr(out, "timestamp", None) or {}
+        for w in timestamp.get("word") or []:
+            w_start = start + w["start"]
+            if not keep_lo <= w_start < keep_hi:
+                continue
+            word = dict(w, start=w_start, end=start + w["end"])
+            for key in ("start_offset", "end_offset"):
+                if key in word:
+                    if frame_shift is None:
+                        del word[key]
+                    else:
+                        word[key] += frame_shift
+            words.append(word)
+    text = " ".join(w["word"] for w in words)
+    return text, {"word": words, "segment": _segments_from_words(words)}
+
+
 def _maybe_set_local_attention(total_seconds: float):
-    """Switch to local attention for > ~24 minutes (A100-80GB full-attn rule of thumb)."""
+    """
+    Switch to local attention for > ~24 minutes (A100-80GB full-attn rule of thumb).
+    change_attention_model rebuilds the attention layers, so it only runs when the mode changes.
+    """
+    global _CURRENT_ATTN
     if SKIP_MODEL_LOAD:
         return
+    desired = "local" if total_seconds > LOCAL_ATTENTION_AFTER_SEC else "global"
+    if desired == _CURRENT_ATTN:
+        return
     try:
-        if total_seconds > LOCAL_ATTENTION_AFTER_SEC:
+        if desired == "local":
             MODEL.change_attention_model(
                 self_attention_model="rel_pos_local_attn",
                 att_context_size=[256, 256]
@@ -143,142 +1062,510 @@ def _maybe_set_local_attention(total_seconds: float):
     except Exception:
         # Not all variants support toggling back and forth; ignore silently.
         pass
+    # Recorded even on failure so unsupported variants aren't retried on every batch
+    _CURRENT_ATTN = desired
 
 
-def _bucketize_by_duration(items: List[Tuple[str, float]]):
+def _split_longs(items: Iterable[Tuple[int, str, float]],
+                 long_parts: List[Optional[Tuple[float, List[Any]]]]
+                 ) -> Iterator[Tuple[int, str, float, Optional[int]]]:
     """
-    Split into (shorts, longs) by SHORT_MAX_SEC.
-    items: list of (wav_path, duration_sec)
+    Pass shorts (<= SHORT_MAX_SEC) through as (idx, path, duration, None) and replace each long
+    by its windows (idx, path, window_sec, k), registering (duration, [None] * n_chunks) at
+    long_parts[idx] so the window outputs can be merged once all of them are back.
     """
-    shorts, longs = [], []
-    for p, d in items:
-        (shorts if d <= SHORT_MAX_SEC else longs).append((p, d))
-    return shorts, longs
+    for idx, p, d in items:
+        if d <= SHORT_MAX_SEC or SKIP_MODEL_LOAD:
+            yield idx, p, d, None
+            continue
+        n_chunks = max(1, math.ceil(d / LONG_CHUNK_SEC))
+        long_parts[idx] = (d, [None] * n_chunks)
+        for k in range(n_chunks):
+            start, length = _chunk_window(k, n_chunks)
+            yield idx, p, (length if length is not None else d - start), k
 
 
-def _make_batches(shorts: List[Tuple[str, float]]) -> List[List[Tuple[str, float]]]:
+def _make_batches(shorts: Iterable[Tuple[int, str, float, Optional[int]]]
+                  ) -> Iterator[List[Tuple[int, str, float, Optional[int]]]]:
     """
-    Pack shorts into batches respecting BATCH_MAX_ITEMS and BATCH_MAX_TOTAL_SEC.
-    Greedy pack by arrival order (simple and effective for our case).
+    Online packer: bucket shorts into DURATION_BAND_SEC-wide duration bands and yield a band's
+    batch as soon as it hits BATCH_MAX_ITEMS or BATCH_MAX_TOTAL_SEC. Clips in a batch then have
+    near-uniform lengths, so little of the batched forward pass is spent on padding.
+    Partially filled bands are flushed at the end, shortest band first. Long-file windows are
+    banded apart from shorts: only they need word timestamps (for the merge), so shorts never
+    pay for timestamp decoding they didn't ask for.
     """
-    batches, current = [], []
-    sum_sec = 0.0
-    for p, d in shorts:
-        fits_count = len(current) < BATCH_MAX_ITEMS
-        fits_total = (sum_sec + d) <= BATCH_MAX_TOTAL_SEC
-        if fits_count and fits_total:
-            current.append((p, d))
-            sum_sec += d
-        else:
-            if current:
-                batches.append(current)
-            current = [(p, d)]
-            sum_sec = d
-    if current:
-        batches.append(current)
-    return batches
+    batches_by_band: Dict[Tuple[int, bool], List[Tuple[int, str, float, Optional[int]]]] = defaultdict(list)
+    sum_by_band: Dict[Tuple[int, bool], float] = defaultdict(float)
+    for entry in shorts:
+        d = entry[2]
+        band = (int(d // DURATION_BAND_SEC), entry[3] is not None)
+        current = batches_by_band[band]
+        if current and (sum_by_band[band] + d) > BATCH_MAX_TOTAL_SEC:
+            yield batches_by_band.pop(band)
+            sum_by_band[band] = 0.0
+            current = batches_by_band[band]
+        current.append(entry)
+        sum_by_band[band] += d
+        if len(current) >= BATCH_MAX_ITEMS:
+            yield batches_by_band.pop(band)
+            sum_by_band[band] = 0.0
+    for band in sorted(batches_by_band):
+        if batches_by_band[band]:
+            yield sorted(batches_by_band[band], key=lambda entry: entry[2])
 
 
-# -------------------------
-# Core
-# -------------------------
-def transcribe_batched(inputs: List[Dict[str, Any]], want_ts: bool) -> List[Dict[str, Any]]:
+def _prepare_input(item: Dict[str, Any], temp_files: List[str]) -> Tuple[str, float]:
     """
-    Hybrid strategy:
-      1) Validate WAV format and measure durations
-      2) Batch shorts; process longs sequentially
-      3) Preserve output order matching the original inputs list
+    Measure a single input, avoiding a full download where possible.
+    Returns (path, duration_sec). For URLs, path stays the URL (fetched once it is scheduled
+    into a batch) unless the body had to be downloaded to measure it.
     """
-    # 1) Validate format and collect metadata
-    validated: List[Tuple[str, float]] = []  # list of (local_path, duration)
-    temp_files: List[str] = []  # Track temp files for cleanup
+    src = item["source"]
+
+    # Use provided duration if available, otherwise determine it
+    if "duration" in item and item["duration"] is not None:
+        return src, float(item["duration"])
+
+    # Header-only probe: one small Range request instead of the whole file
+    if src.startswith('http') and not SKIP_MODEL_LOAD:
+        dur = _probe_duration_http(src)
+        if dur is not None:
+            return src, dur
+
+    return _get_cached_duration(src, temp_files)
 
-    for item in inputs:
-        src = item["source"]
+
+def _put_until_stopped(q: "queue.Queue", msg: Any, stop: threading.Event) -> bool:
+    """Put onto a bounded queue, blocking while it is full but never past `stop`."""
+    while not stop.is_set():
         try:
-            _validate_wav_format(src)
+            q.put(msg, timeout=0.1)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+def _producer(inputs: List[Dict[str, Any]], out_q: "queue.Queue", temp_files: List[str],
+              stop: threading.Event):
+    """
+    Measure inputs on a thread pool and push (idx, path, duration) onto out_q
+    as each one completes. Failures are pushed as (idx, source, exception) so the consumer
+    raises them on its own thread. Stops early once `stop` is set.
+    """
+    def _work(idx: int, item: Dict[str, Any]):
+        if stop.is_set():
+            return
+        try:
+            local_path, dur = _prepare_input(item, temp_files)
+            _put_until_stopped(out_q, (idx, local_path, dur), stop)
+        except Exception as e:
+            _put_until_stopped(out_q, (idx, item["source"], e), stop)
+
+    max_workers = max(1, min(DOWNLOAD_MAX_WORKERS, len(inputs)))
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for idx, item in enumerate(inputs):
+            pool.submit(_work, idx, item)
+
+
+def _drain(out_q: "queue.Queue", count: int, stop: threading.Event) -> Iterator[Tuple[int, str, float]]:
+    """
+    Yield `count` producer results in completion order, re-raising producer failures.
+    Returns early once `stop` is set.
+    """
+    for _ in range(count):
+        while True:
+            if stop.is_set():
+                return
+            try:
+                idx, path, dur = out_q.get(timeout=0.1)
+                break
+            except queue.Empty:
+                pass
+        if isinstance(dur, ValueError):
+            raise ValueError(f"Invalid audio format for {path}: {dur}. Required: 16kHz mono WAV file.")
+        if isinstance(dur, Exception):
+            raise dur
+        yield idx, path, dur
 
-            # Download URLs to temp files for NeMo processing
-            if src.startswith('http'):
-                local_path = _download_url_to_temp(src)
-                temp_files.append(local_path)
-            else:
-                local_path = src
 
-            # Use provided duration if available, otherwise determine it
-            if "duration" in item and item["duration"] is not None:
-                dur = float(item["duration"])
+def _schedule_fetches(items: Iterable[Tuple[int, str, float]], pool: ThreadPoolExecutor,
+                      temp_files: List[str], fetches: List[Optional[Future]]) -> Iterator[Tuple[int, str, float]]:
+    """
+    Start downloading each URL entry as soon as it is handed to the packer: shorts into memory,
+    longs to a temp file (their windows are read piecewise). Local files get a readahead hint
+    instead so their pages are cached by the time their batch is loaded.
+    """
+    for entry in items:
+        idx, p, d = entry
+        if p.startswith('http'):
+            if d <= SHORT_MAX_SEC:
+                fetches[idx] = pool.submit(_download_url_to_buffer, p)
             else:
-                dur = _get_duration_seconds(local_path)
-            validated.append((local_path, dur))
+                fetches[idx] = pool.submit(_fetch_url, p, temp_files)
+        else:
+            _fadvise(p, "POSIX_FADV_SEQUENTIAL", "POSIX_FADV_WILLNEED")
+        yield entry
+
+
+def _resolve_paths(batch: List[Tuple[int, str, float, Optional[int]]],
+                   fetches: List[Optional[Future]]) -> List[Union[str, io.BytesIO]]:
+    """
+    Wait for a batch's downloads and return local paths / in-memory files in batch order.
+    In-memory downloads are released here; long-file temp paths stay for their other windows.
+    """
+    sources = []
+    for idx, p, _, k in batch:
+        fut = fetches[idx]
+        if fut is None:
+            sources.append(p)
+            continue
+        if k is None:
+            fetches[idx] = None
+        try:
+            sources.append(fut.result())
         except ValueError as e:
-            # Clean up any temp files created so far
-            _cleanup_files(temp_files)
-            raise ValueError(f"Invalid audio format for {src}: {e}. Required: 16kHz mono WAV file.")
+            raise ValueError(f"Invalid audio format for {p}: {e}. Required: 16kHz mono WAV file.")
+    return sources
+
+
+def _batch_segments(batch: List[Tuple[int, str, float, Optional[int]]],
+                    sources: List[Union[str, io.BytesIO]],
+                    long_parts: List[Optional[Tuple[float, List[Any]]]]
+                    ) -> List[Tuple[Union[str, io.BytesIO], int, int]]:
+    """(source, start_frame, frames) to load per entry: whole clips, or a long file's window."""
+    segments = []
+    for (idx, _, _, k), p in zip(batch, sources):
+        if k is None:
+            segments.append((p, 0, -1))
+        else:
+            start, length = _chunk_window(k, len(long_parts[idx][1]))
+            frames = -1 if length is None else int(round(length * SAMPLE_RATE))
+            segments.append((p, int(round(start * SAMPLE_RATE)), frames))
+    return segments
+
+
+def _stage_batches(batches: Iterable[List[Tuple[int, str, float, Optional[int]]]],
+                   fetches: List[Optional[Future]],
+                   long_parts: List[Optional[Tuple[float, List[Any]]]],
+                   ready_q: "queue.Queue", stop: threading.Event):
+    """
+    Staging thread: pack batches, wait for their downloads, decode them into pinned memory and
+    start their H2D copies, handing (batch, audio, lengths, ready_event) to the GPU loop through ready_q.
+    The queue holds one batch, so batch k+1 is loaded and copied while batch k is transcribed.
+    Ends with a None sentinel; failures are handed over as the exception itself.
+    """
+    try:
+        for batch in batches:
+            # The GPU loop failed or finished: don't wait on (or decode) batches nobody will run
+            if stop.is_set():
+                return
+            sources = _resolve_paths(batch, fetches)
+            staged = (batch, None, None, None)
+            if not SKIP_MODEL_LOAD:
+                staged = (batch, *_load_batch_tensor(_batch_segments(batch, sources, long_parts)))
+            if not _put_until_stopped(ready_q, staged, stop):
+                return
+        _put_until_stopped(ready_q, None, stop)
+    except Exception as e:
+        _put_until_stopped(ready_q, e, stop)
+
 
-    # 2) Bucketize
-    shorts, longs = _bucketize_by_duration(validated)
-    short_batches = _make_batches(shorts)
+def _transcribe_audio(audio: "torch.Tensor", lengths: List[int], ready: Optional["torch.cuda.Event"],
+                      timestamps: bool, max_dur: float) -> List[Any]:
+    """Run one staged batch (flat audio + per-clip lengths) through MODEL on this process's GPU."""
+    # Attention mode for batch: use the max duration in batch
+    _maybe_set_local_attention(max_dur)
+    if ready is not None:
+        compute_stream = torch.cuda.current_stream()
+        compute_stream.wait_event(ready)
+        # Allocated on the copy stream: keep the allocator from recycling it under compute
+        audio.record_stream(compute_stream)
+    # No-op when already staged on DEVICE; the GPU worker copies from shared memory here
+    audio = audio.to(DEVICE)
+    with _inference_context():
+        # One encoder forward per packed batch (NeMo would otherwise split it into its default
+        # sub-batches), so the batch shapes the packer and compile warm-up plan for are the real ones
+        outs = MODEL.transcribe(list(torch.split(audio, lengths)), batch_size=len(lengths),
+                                timestamps=timestamps)
+    if CUDA_MEMORY_DEBUG_DIR and DEVICE.type == "cuda":
+        _check_cuda_fragmentation()
+    return outs
 
-    results_by_index: Dict[int, Dict[str, Any]] = {}
 
-    # Build index map from wav path to original item index (to preserve ordering)
-    path_to_index = {}
-    for idx, item in enumerate(inputs):
-        # We validated in the same order, this is safe:
-        path_to_index[validated[idx][0]] = idx
+def _check_cuda_fragmentation():
+    """Debug: fail the batch (after dumping an allocator snapshot) if cached VRAM is fragmented."""
+    stats = torch.cuda.memory_stats()
+    reserved = stats.get("reserved_bytes.all.current", 0)
+    split = stats.get("inactive_split_bytes.all.current", 0)
+    fragmented = reserved > 0 and split / reserved > CUDA_MEMORY_DEBUG_MAX_FRAG
+    if fragmented:
+        path = os.path.join(CUDA_MEMORY_DEBUG_DIR, f"cuda_snapshot_{uuid.uuid4().hex}.pickle")
+        torch.cuda.memory._dump_snapshot(path)
+        print(f"CUDA allocator snapshot written to {path}")
+    assert not fragmented, (
+        f"CUDA memory fragmented: {split / 2**20:.0f} MiB of {reserved / 2**20:.0f} MiB reserved "
+        f"is in inactive split blocks")
+
+
+# -------------------------
+# Core
+# -------------------------
+def transcribe_batched(inputs: List[Dict[str, Any]], want_ts: bool) -> List[Dict[str, Any]]:
+    """
+    Hybrid strategy:
+      1) Validate WAV format up front
+      2) Measure inputs on a thread pool (header-only probes for URLs) while the GPU consumes ready batches
+      3) Batch shorts as they arrive; longs are split into overlapping windows that are
+         batched the same way and merged back (middle-token) once all windows are done.
+         URL bodies are downloaded only once measured and handed to the packer
+         (into memory for shorts, to a temp file for longs)
+      4) Preserve output order matching the original inputs list
+    """
+    # 1) Validate format up front so a bad input fails before any download starts
+    _validate_wav_formats(inputs)
+
+    # 2) Start the producer; the bounded queue caps how far downloads run ahead of the GPU
+    out_q: "queue.Queue" = queue.Queue(maxsize=2 * BATCH_MAX_ITEMS)
+    stop = threading.Event()
+    temp_files: List[str] = []  # Track temp files for cleanup
+    producer = threading.Thread(target=_producer, args=(inputs, out_q, temp_files, stop), daemon=True)
+    producer.start()
+
+    results: List[Optional[Dict[str, Any]]] = [None] * len(inputs)
+    # Per-input state is tracked by position: the input index travels with every entry
+    long_parts: List[Optional[Tuple[float, List[Any]]]] = [None] * len(inputs)  # (duration, window outputs)
+    fetch_pool = ThreadPoolExecutor(max_workers=max(1, min(DOWNLOAD_MAX_WORKERS, len(inputs))))
+    fetches: List[Optional[Future]] = [None] * len(inputs)
+
+    ready_q: "queue.Queue" = queue.Queue(maxsize=1)
+    batches = _make_batches(_split_longs(
+        _schedule_fetches(_drain(out_q, len(inputs), stop), fetch_pool, temp_files, fetches),
+        long_parts))
+    stager = threading.Thread(
+        target=_stage_batches, args=(batches, fetches, long_parts, ready_q, stop), daemon=True)
+    stager.start()
 
     try:
-        # 3) Process short batches in parallel (batched forward pass)
-        for batch in short_batches:
-            wavs = [p for (p, _) in batch]
-            # Attention mode for batch: use the max duration in batch
-            max_dur = max(d for (_, d) in batch) if batch else 0.0
-            _maybe_set_local_attention(max_dur)
+        # 3) Run each batch as soon as it is staged. Longs are split into windows that are packed
+        #    like any other short. URL bodies download in the background once they are packed,
+        #    and the next batch is loaded/copied to the GPU while this one is transcribed.
+        while True:
+            staged = ready_q.get()
+            if staged is None:
+                break
+            if isinstance(staged, Exception):
+                raise staged
+            batch, audio, lengths, ready = staged
 
             if SKIP_MODEL_LOAD:
                 outs = [{"text": f"[dry-run] Transcribed placeholder for {p}"}
-                        for p in wavs]
+                        for (_, p, _, _) in batch]
             else:
-                outs = MODEL.transcribe(wavs, timestamps=want_ts)
+                max_dur = max(entry[2] for entry in batch)
+                # Windows always need word timestamps for the merge
+                batch_ts = want_ts or batch[0][3] is not None
+                if _GPU_WORKER is not None:
+                    outs = _GPU_WORKER.transcribe(audio, lengths, batch_ts, max_dur)
+                else:
+                    outs = _transcribe_audio(audio, lengths, ready, batch_ts, max_dur)
+
+            # Every output of one transcribe call has the same schema: check it once per batch
+            has_text = hasattr(outs[0], "text")
+            has_ts = want_ts and hasattr(outs[0], "timestamp")
+            for (idx, _, d, k), out in zip(batch, outs):
+                if k is not None:
+                    duration, parts = long_parts[idx]
+                    parts[k] = out
+                    if any(part is None for part in parts):
+                        continue
+                    text, timestamps = _merge_chunks(parts)
+                    payload = {"text": text, "duration_sec": duration}
+                    if want_ts:
+                        payload["timestamps"] = timestamps
+                    results[idx] = payload
+                    long_parts[idx] = None
+                    continue
 
-            for p, d, out in zip(wavs, [d for (_, d) in batch], outs):
-                idx = path_to_index[p]
-                text = getattr(out, "text", str(out))
-                payload = {"text": text, "duration_sec": d}
-                if want_ts and hasattr(out, "timestamp"):
+                payload = {"text": out.text if has_text else str(out), "duration_sec": d}
+                if has_ts:
+                    timestamp = out.timestamp
                     payload["timestamps"] = {
-                        "word": out.timestamp.get("word"),
-                        "segment": out.timestamp.get("segment")
+                        "word": timestamp.get("word"),
+                        "segment": timestamp.get("segment")
                     }
-                results_by_index[idx] = payload
+                results[idx] = payload
 
-        # 4) Process long audios sequentially (safer for memory)
-        for p, d in longs:
-            _maybe_set_local_attention(d)
+    finally:
+        # 4) Stop the producer/stager/fetchers (lets in-flight downloads finish), clean up temp files
+        stop.set()
+        stager.join()
+        producer.join()
+        fetch_pool.shutdown(wait=True, cancel_futures=True)
+        _cleanup_files(temp_files)
 
-            if SKIP_MODEL_LOAD:
-                out_obj = {
-                    "text": f"[dry-run] Transcribed placeholder for {p}"}
+    # 5) Results were written by input position, so they are already in original order
+    return results
+
+
+# -------------------------
+# GPU worker process
+# -------------------------
+def _portable_output(out: Any) -> Any:
+    """
+    Reduce a NeMo hypothesis to what the handler reads (text, word/segment timestamps) so it
+    pickles cheaply and holds no CUDA tensors of the worker.
+    """
+    if not hasattr(out, "text"):
+        return str(out)
+    portable = types.SimpleNamespace(text=out.text)
+    timestamp = getattr(out, "timestamp", None)
+    if timestamp is not None:
+        portable.timestamp = {"word": timestamp.get("word"), "segment": timestamp.get("segment")}
+    return portable
+
+
+def _gpu_worker_loop(in_q, out_q):
+    """
+    GPU worker entry point. The model was loaded when the worker imported this module; serve
+    (batch_id, audio, lengths, timestamps, max_dur) requests until a None sentinel arrives.
+    First announces the model's timestamp frame stride as a (None, stride) message.
+    """
+    out_q.put((None, _TIME_STRIDE_SEC))
+    while True:
+        msg = in_q.get()
+        if msg is None:
+            return
+        batch_id, audio, lengths, timestamps, max_dur = msg
+        try:
+            outs = _transcribe_audio(audio, lengths, None, timestamps, max_dur)
+            out_q.put((batch_id, [_portable_output(o) for o in outs]))
+        except Exception as e:
+            # Re-raised in the handler process; repr keeps unpicklable exceptions from hanging it
+            out_q.put((batch_id, RuntimeError(f"GPU worker failed: {e!r}")))
+
+
+class _GpuWorkerClient:
+    """
+    Handler-side proxy for the GPU worker process: submits batches through a request queue and
+    resolves per-batch futures by batch_id from a dispatcher thread, so concurrent invocations
+    share one model.
+    """
+
+    def __init__(self):
+        import torch.multiprocessing as mp
+
+        self._ctx = mp.get_context("spawn")
+        self._start()
+        self._ids = itertools.count()
+        self._pending: Dict[int, Future] = {}
+        self._lock = threading.Lock()
+        self._closing = False
+        threading.Thread(target=self._dispatch, daemon=True).start()
+        atexit.register(self.close)
+
+    def _start(self):
+        """Spawn a worker on fresh queues (a killed worker can leave the old ones corrupt) and wait for it."""
+        self.in_q = self._ctx.Queue()
+        self.out_q = self._ctx.Queue()
+        # Not daemonic so the worker may start its own helper processes; stopped at exit instead
+        os.environ["_PARAKEET_GPU_WORKER"] = "1"
+        try:
+            self.proc = self._ctx.Process(target=_gpu_worker_loop, args=(self.in_q, self.out_q),
+                                          name="parakeet-gpu-worker")
+            self.proc.start()
+        finally:
+            os.environ.pop("_PARAKEET_GPU_WORKER", None)
+        self._wait_ready()
+
+    def _wait_ready(self):
+        """
+        Block until the worker has loaded the model (as an in-process load blocks import) and
+        announced its timestamp frame stride, which long-audio windows are aligned to.
+        """
+        global _TIME_STRIDE_SEC
+        while True:
+            try:
+                _, _TIME_STRIDE_SEC = self.out_q.get(timeout=5.0)
+                return
+            except queue.Empty:
+                if not self.proc.is_alive():
+                    raise RuntimeError(
+                        f"GPU worker exited with code {self.proc.exitcode} while loading the model")
+
+    def transcribe(self, audio: "torch.Tensor", lengths: List[int], timestamps: bool,
+                   max_dur: float) -> List[Any]:
+        """Run one batch in the worker and wait for its outputs. `audio` must be in shared memory."""
+        fut: Future = Future()
+        # Under the lock so a respawn can't swap queues between registering and submitting;
+        # waits out a respawn in progress. put() only hands off to the queue's feeder thread.
+        with self._lock:
+            batch_id = next(self._ids)
+            self._pending[batch_id] = fut
+            self.in_q.put((batch_id, audio, lengths, timestamps, max_dur))
+        return fut.result()
+
+    def _respawn(self, failures: int):
+        """Replace a dead worker, backing off between attempts; exit the process once out of retries."""
+        while True:
+            if failures > GPU_WORKER_MAX_RESTARTS:
+                print(f"GPU worker still failing after {GPU_WORKER_MAX_RESTARTS} restarts; "
+                      "exiting so the pod is replaced")
+                os._exit(1)
+            delay = min(GPU_WORKER_RESTART_BACKOFF_SEC * 2 ** (failures - 1), 60.0)
+            print(f"Warning: GPU worker exited with code {self.proc.exitcode}; "
+                  f"restarting in {delay:.0f}s ({failures}/{GPU_WORKER_MAX_RESTARTS})")
+            time.sleep(delay)
+            try:
+                self._start()
+                return
+            except Exception as e:
+                print(f"Warning: GPU worker restart failed: {e}")
+                failures += 1
+
+    def _dispatch(self):
+        global _TIME_STRIDE_SEC
+        failures = 0
+        while True:
+            try:
+                batch_id, outs = self.out_q.get(timeout=1.0)
+            except queue.Empty:
+                if self.proc.is_alive() or self._closing:
+                    continue
+                # Worker died (e.g. CUDA OOM kill): fail everything in flight instead of hanging,
+                # then bring up a new one; new batches wait on the lock until it's ready
+                with self._lock:
+                    pending, self._pending = self._pending, {}
+                    for fut in pending.values():
+                        fut.set_exception(RuntimeError(
+                            f"GPU worker exited with code {self.proc.exitcode}"))
+                    failures += 1
+                    self._respawn(failures)
+                continue
+            if batch_id is None:
+                # Worker startup message: merging long-file windows needs the timestamp frame stride
+                _TIME_STRIDE_SEC = outs
+                continue
+            with self._lock:
+                fut = self._pending.pop(batch_id, None)
+            if fut is None:
+                continue
+            if isinstance(outs, Exception):
+                fut.set_exception(outs)
             else:
-                out_obj = MODEL.transcribe([p], timestamps=want_ts)[0]
-
-            idx = path_to_index[p]
-            text = getattr(out_obj, "text", str(out_obj))
-            payload = {"text": text, "duration_sec": d}
-            if want_ts and hasattr(out_obj, "timestamp"):
-                payload["timestamps"] = {
-                    "word": out_obj.timestamp.get("word"),
-                    "segment": out_obj.timestamp.get("segment")
-                }
-            results_by_index[idx] = payload
+                failures = 0
+                fut.set_result(outs)
 
-    finally:
-        # 5) Clean up temporary files
-        _cleanup_files(temp_files)
+    def close(self):
+        self._closing = True
+        if self.proc.is_alive():
+            self.in_q.put(None)
+            self.proc.join(timeout=30)
 
-    # 6) Return results in original input order
-    return [results_by_index[i] for i in range(len(inputs))]
+
+if _GPU_CLIENT:
+    _GPU_WORKER = _GpuWorkerClient()
 
 
 def handler(event: Dict[str, Any]) -> Dict[str, Any]:
@@ -300,9 +1587,22 @@ def handler(event: Dict[str, Any]) -> Dict[str, Any]:
     return {"results": transcribe_batched(items, want_ts)}
 
 
+async def async_handler(event: Dict[str, Any]) -> Dict[str, Any]:
+    """handler() on a worker thread, so Runpod can run several jobs at once."""
+    return await asyncio.to_thread(handler, event)
+
+
 # ✅ Only start the Runpod worker if explicitly enabled (so local imports stay quiet)
-if os.getenv("RUNPOD_SERVERLESS", "0") in ("1", "true", "True"):
-    runpod.serverless.start({"handler": handler})
+if os.getenv("RUNPOD_SERVERLESS", "0") in ("1", "true", "True") and not _IN_GPU_WORKER:
+    if _GPU_CLIENT and MAX_CONCURRENCY > 1:
+        runpod.serverless.start({
+            "handler": async_handler,
+            "concurrency_modifier": lambda current: MAX_CONCURRENCY,
+        })
+    else:
+        if MAX_CONCURRENCY > 1:
+            print("Warning: MAX_CONCURRENCY needs GPU_WORKER_PROCESS=1; serving one job at a time")
+        runpod.serverless.start({"handler": handler})
 
 
 # Local convenience runner
@@ -0,0 +1,120 @@
+import os
+import types
+import unittest
+from unittest import mock
+
+# Dry-run import: chunking and merging long audio don't need NeMo
+os.environ["SKIP_MODEL_LOAD"] = "1"
+import handler  # noqa: E402
+
+STRIDE = 0.08  # seconds per encoder frame (10ms hop x 8x subsampling)
+
+
+def window_output(k: int, n_chunks: int, words):
+    """Fake NeMo hypothesis for window k, given (word, absolute start, absolute end) tuples."""
+    start, length = handler._chunk_window(k, n_chunks)
+    end = float("inf") if length is None else start + length
+    visible = []
+    for word, w_start, w_end in words:
+        if start <= w_start < end:
+            # Like NeMo: integer frame offsets, times are offset * stride
+            start_offset = int(round((w_start - start) / STRIDE))
+            end_offset = int(round((min(w_end, end) - start) / STRIDE))
+            visible.append({
+                "word": word,
+                "start": start_offset * STRIDE,
+                "end": end_offset * STRIDE,
+                "start_offset": start_offset,
+                "end_offset": end_offset,
+            })
+    return types.SimpleNamespace(text=" ".join(w["word"] for w in visible),
+                                 timestamp={"word": visible, "segment": []})
+
+
+@mock.patch.multiple(handler, LONG_CHUNK_SEC=8.0, LONG_CHUNK_BUFFER_SEC=10.0, SHORT_MAX_SEC=600,
+                     _TIME_STRIDE_SEC=STRIDE)
+class LongAudioTest(unittest.TestCase):
+    def assertWindow(self, window, start, length):
+        self.assertAlmostEqual(window[0], start)
+        if length is None:
+            self.assertIsNone(window[1])
+        else:
+            self.assertAlmostEqual(window[1], length)
+
+    def test_chunk_windows(self):
+        self.assertWindow(handler._chunk_window(0, 3), 0.0, 9.0)
+        # 7.0s is 87.5 frames: floored onto the frame grid, the end stays at 17s
+        self.assertWindow(handler._chunk_window(1, 3), 6.96, 10.04)
+        # Last window runs to EOF
+        self.assertWindow(handler._chunk_window(2, 3), 14.96, None)
+        self.assertWindow(handler._chunk_window(0, 1), 0.0, None)
+        for k in range(3):
+            start, _ = handler._chunk_window(k, 3)
+            self.assertAlmostEqual(start / STRIDE, round(start / STRIDE))
+
+    def test_chunk_windows_without_frame_stride(self):
+        with mock.patch.object(handler, "_TIME_STRIDE_SEC", None):
+            self.assertEqual(handler._chunk_window(1, 3), (7.0, 10.0))
+            self.assertEqual(handler._chunk_window(2, 3), (15.0, None))
+
+    def test_split_longs(self):
+        long_parts = [None, None]
+        with mock.patch.object(handler, "SKIP_MODEL_LOAD", False):
+            entries = list(handler._split_longs([(0, "short.wav", 30.0), (1, "long.wav", 620.0)],
+                                                long_parts))
+        self.assertEqual(entries[0], (0, "short.wav", 30.0, None))
+        windows = entries[1:]
+        self.assertEqual(len(windows), 78)  # ceil(620 / 8)
+        self.assertEqual([k for _, _, _, k in windows], list(range(78)))
+        self.assertAlmostEqual(windows[0][2], 9.0)
+        self.assertAlmostEqual(windows[1][2], 10.04)
+        # Last window: from its start (77 * 8 - 1, floored onto the frame grid) to EOF
+        self.assertAlmostEqual(windows[-1][2], 620.0 - 614.96)
+        self.assertIsNone(long_parts[0])
+        self.assertEqual(long_parts[1], (620.0, [None] * 78))
+
+    def test_merge_keeps_each_word_once_at_stride_edges(self):
+        duration, n_chunks = 30.0, 4
+        # Times on the 80ms frame grid, as NeMo reports them
+        words = [
+            ("a", 0.0, 0.4),
+            ("before.", 7.92, 8.32),  # starts one frame before the 8s stride edge: window 0 keeps it
+            ("edge", 8.0, 8.4),       # starts exactly on the edge: window 1 keeps it
+            ("b", 15.6, 15.92),
+            ("c", 16.0, 16.48),
+            ("tail", 29.52, 29.92),   # only in the last (EOF) window
+        ]
+        outs = [window_output(k, n_chunks, words) for k in range(n_chunks)]
+        text, timestamps = handler._merge_chunks(outs)
+
+        self.assertEqual(text, "a before. edge b c tail")
+        merged = timestamps["word"]
+        self.assertEqual([w["word"] for w in merged], [w for w, _, _ in words])
+        for w, (_, start, end) in zip(merged, words):
+            self.assertAlmostEqual(w["start"], start)
+            self.assertAlmostEqual(w["end"], end)
+            # Offsets are shifted in whole frames, in step with the shifted times
+            self.assertEqual(w["start_offset"], round(start / STRIDE))
+            self.assertEqual(w["end_offset"], round(end / STRIDE))
+
+        self.assertEqual([seg["segment"] for seg in timestamps["segment"]],
+                         ["a before.", "edge b c tail"])
+        first, second = timestamps["segment"]
+        self.assertEqual(set(first), {"segment", "start", "end", "start_offset", "end_offset"})
+        self.assertEqual(second["start"], merged[2]["start"])
+        self.assertEqual(second["end_offset"], merged[-1]["end_offset"])
+
+    def test_merge_drops_offsets_without_frame_stride(self):
+        outs = [window_output(0, 1, [("only", 1.0, 1.5)])]
+        with mock.patch.object(handler, "_TIME_STRIDE_SEC", None):
+            _, timestamps = handler._merge_chunks(outs)
+        self.assertEqual([set(w) for w in timestamps["word"]], [{"word", "start", "end"}])
+
+    def test_windows_are_batched_apart_from_shorts(self):
+        entries = [(0, "a.wav", 9.0, None), (1, "long.wav", 9.0, 0), (2, "b.wav", 5.0, None)]
+        batches = list(handler._make_batches(entries))
+        self.assertEqual(sorted([e[0] for e in b] for b in batches), [[1], [2, 0]])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+import io
+import os
+import struct
+import unittest
+
+# Dry-run import: header parsing and source validation don't need NeMo
+os.environ["SKIP_MODEL_LOAD"] = "1"
+import handler  # noqa: E402
+
+
+def chunk(chunk_id: bytes, body: bytes, declared_size: int = None) -> bytes:
+    size = len(body) if declared_size is None else declared_size
+    pad = b"\x00" if len(body) & 1 else b""
+    return struct.pack("<4sI", chunk_id, size) + body + pad
+
+
+def fmt_chunk(sample_rate=16000, channels=1, bits=16, fmt_tag=1) -> bytes:
+    block_align = channels * bits // 8
+    body = struct.pack("<HHIIHH", fmt_tag, channels, sample_rate,
+                       sample_rate * block_align, block_align, bits)
+    return chunk(b"fmt ", body)
+
+
+def wav(*chunks: bytes, magic: bytes = b"RIFF") -> bytes:
+    body = b"WAVE" + b"".join(chunks)
+    return magic + struct.pack("<I", len(body)) + body
+
+
+def duration(data: bytes, file_size=None):
+    return handler._parse_wav_duration(io.BytesIO(data), file_size)
+
+
+class ParseWavDurationTest(unittest.TestCase):
+    def test_plain_pcm(self):
+        self.assertAlmostEqual(duration(wav(fmt_chunk(), chunk(b"data", b"\x00" * 32000))), 1.0)
+
+    def test_list_chunk_before_data(self):
+        data = wav(fmt_chunk(), chunk(b"LIST", b"INFOISFT" + b"\x00" * 8), chunk(b"data", b"\x00" * 16000))
+        self.assertAlmostEqual(duration(data), 0.5)
+
+    def test_odd_sized_chunk_is_word_aligned(self):
+        data = wav(fmt_chunk(), chunk(b"junk", b"\x01" * 7), chunk(b"data", b"\x00" * 32000))
+        self.assertAlmostEqual(duration(data), 1.0)
+
+    def test_truncated_file_uses_file_size(self):
+        # Header declares 2 s of data but only 1 s is actually present
+        data = wav(fmt_chunk(), chunk(b"data", b"\x00" * 32000, declared_size=64000))
+        self.assertAlmostEqual(duration(data, file_size=len(data)), 1.0)
+
+    def test_prefix_only_with_file_size(self):
+        # Range-probe case: only the header prefix is read, the size comes from the response
+        data = wav(fmt_chunk(), chunk(b"data", b"\x00" * 32000))
+        self.assertAlmostEqual(duration(data[:64], file_size=len(data)), 1.0)
+
+    def test_stereo_float(self):
+        data = wav(fmt_chunk(sample_rate=8000, channels=2, bits=32, fmt_tag=3),
+                   chunk(b"data", b"\x00" * 64000))
+        self.assertAlmostEqual(duration(data), 1.0)
+
+    def test_data_size_zero_or_streamed(self):
+        for size in (0, 0xFFFFFFFF):
+            data = wav(fmt_chunk(), struct.pack("<4sI", b"data", size) + b"\x00" * 100)
+            self.assertIsNone(duration(data), size)
+
+    def test_rf64_not_parsed(self):
+        self.assertIsNone(duration(wav(fmt_chunk(), chunk(b"data", b"\x00" * 100), magic=b"RF64")))
+
+    def test_non_linear_format(self):
+        self.assertIsNone(duration(wav(fmt_chunk(fmt_tag=0x55), chunk(b"data", b"\x00" * 100))))
+
+    def test_data_before_fmt(self):
+        self.assertIsNone(duration(wav(chunk(b"data", b"\x00" * 100), fmt_chunk())))
+
+    def test_truncated_header(self):
+        data = wav(fmt_chunk(), chunk(b"data", b"\x00" * 100))
+        self.assertIsNone(duration(data[:30]))
+
+
+class WavSourceTest(unittest.TestCase):
+    def valid(self, src: str) -> bool:
+        return bool(handler._WAV_SOURCE_RE.match(src))
+
+    def test_local_paths(self):
+        self.assertTrue(self.valid("/data/a.wav"))
+        self.assertTrue(self.valid("/data/A.WAV"))
+        self.assertTrue(self.valid("/data/a?b.wav"))
+        self.assertFalse(self.valid("/data/a.wav?x=1"))
+        self.assertFalse(self.valid("/data/a.mp3"))
+        self.assertFalse(self.valid("a.wav\n"))
+
+    def test_urls_strip_query_string(self):
+        self.assertTrue(self.valid("https://host/a.wav"))
+        self.assertTrue(self.valid("https://host/a.Wav?X-Amz-Signature=abc"))
+        self.assertFalse(self.valid("https://host/a.mp3?name=.wav"))
+        self.assertFalse(self.valid("https://host/a?b.wav"))
+        self.assertFalse(self.valid("https://host/a.wav.mp3"))
+
+    def test_validate_lists_every_invalid_source(self):
+        with self.assertRaises(ValueError) as ctx:
+            handler._validate_wav_formats(
+                [{"source": "/a.wav"}, {"source": "/b.mp3"}, {"source": "http://h/c.ogg?x"}])
+        self.assertIn("/b.mp3", str(ctx.exception))
+        self.assertIn("http://h/c.ogg?x", str(ctx.exception))
+
+
+if __name__ == "__main__":
+    unittest.main()